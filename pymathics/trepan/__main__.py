@@ -41,7 +41,7 @@ from pymathics.trepan.tracing import (
     trace_evaluate,
 )
 
-from typing import Dict, Optional, Tuple
+from typing import Dict, FrozenSet, Optional, Tuple
 
 # FIXME: DRY with debugger.tracing.TraceEventNames
 EVENT_OPTIONS: Dict[str, str] = {
@@ -110,7 +110,7 @@ class DebugActivate(Builtin):
 
         def validate_option(
             option, evaluation: Evaluation
-        ) -> Tuple[Optional[list], bool]:
+        ) -> Tuple[Optional[FrozenSet[str]], bool]:
             """
             Checks that `option` is valid; it should either be a String, a
             Mathics3 boolean, or a List of Mathics3 String.
@@ -132,12 +132,12 @@ class DebugActivate(Builtin):
                     # as a way to match any "XXX`YYY..`Plus" that might appear in any
                     # context in the future.
                     filters.append(elt.value)
-                return filters, True
+                return frozenset(filters), True
             elif option in (SymbolTrue, SymbolFalse):
                 return (None, True)
             elif isinstance(option, String):
                 # TODO: check that string is a valid {mpmath, SymPy, NumPy} name
-                return ([option.value], True)
+                return (frozenset([option.value]), True)
             else:
                 evaluation.message("DebugActivate", "opttype", option)
                 return None, False
@@ -302,7 +302,7 @@ class TraceActivate(Builtin):
         # DRY with TraceActivate
         def validate_option(
             option, evaluation: Evaluation
-        ) -> Tuple[Optional[list], bool]:
+        ) -> Tuple[Optional[FrozenSet[str]], bool]:
             """
             Checks that `option` is valid; it should either be a
             String, a Mathics3 boolean, or a List of Mathics3 String.
@@ -324,13 +324,13 @@ class TraceActivate(Builtin):
                     # TODO: check that string is a valid {mpmath,
                     # SymPy, Numpy} name.
                     filters.append(elt.value)
-                return filters, True
+                return frozenset(filters), True
             elif option in (SymbolTrue, SymbolFalse):
                 return (None, True)
             elif isinstance(option, String):
                 # TODO: check that string is a valid {mpmath, SymPy,
                 # NumPy} name
-                return ([option.value], True)
+                return (frozenset([option.value]), True)
             else:
                 evaluation.message("TraceActivate", "opttype", option)
                 return None, False
@@ -30,7 +30,8 @@ import os.path as osp
 import sys
 import threading
 import types
-from typing import Any, Dict, Set
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
 
 import mathics.eval.tracing
 import pyficache
@@ -41,13 +42,105 @@ from tracer.tracefilter import TraceFilter
 from trepan.lib.breakpoint import BreakpointManager
 from trepan.lib.default import START_OPTS, STOP_OPTS
 from trepan.lib.stack import count_frames
-from trepan.misc import option_set
 
 from pymathics.trepan.tracing import event_filters
 from pymathics.trepan.processor.cmdproc import CommandProcessor
 
 IGNORE_CODE: Set[types.CodeType] = set([])
 
+# id()s of the code objects in IGNORE_CODE. Code objects hash on their
+# contents, which is slow, while an id() hashes as an int. Use
+# add_ignore_code() to keep the two in step.
+IGNORE_CODE_IDS: Set[int] = set([])
+
+
+def is_pseudo_filename(filename: str) -> bool:
+    """Return True if `filename' is one of the bogus internal Python
+    names enclosed in < ... >, like <string>."""
+    return len(filename) > 1 and filename[0] == "<" and filename[-1] == ">"
+
+
+def interned_event_set(events) -> Optional[FrozenSet[str]]:
+    """Return `events' as a frozenset of interned strings, or None if
+    `events' is None. Event names passed to trace_dispatch() are string
+    literals or come from the interpreter, and so are interned. With
+    interned set members, membership tests succeed on identity without
+    comparing characters."""
+    if events is None:
+        return None
+    return frozenset(sys.intern(event) for event in events)
+
+
+def add_ignore_code(code: types.CodeType):
+    """Add `code' to the code objects that are never stopped in."""
+    IGNORE_CODE.add(code)
+    IGNORE_CODE_IDS.add(id(code))
+
+# Maximum number of filenames remembered by DebuggerCore.canonic().
+FILENAME_CACHE_SIZE = 1024
+
+# Maximum number of code objects DebuggerCore remembers facts about. Those
+# caches are keyed by id(): hashing a code object hashes its contents,
+# and weak references cost more than the lookups they would save. The
+# code object is kept in the cached value, which keeps it alive, so its
+# id can't be reused while the entry is there.
+CODE_CACHE_SIZE = 4096
+
+# Filename prefixes that mean a path is relative to the program's directory.
+CURDIR_PREFIX = os.curdir + os.sep
+PARDIR_PREFIX = os.pardir + os.sep
+
+# PEP 669 sys.monitoring is available starting in Python 3.12. When we can
+# get its debugger tool id, and the "events" setting only asks for Python
+# events it reports just as sys.settrace() would, Python-level events come
+# from there instead of from tracer's sys.settrace() hook. That way, only
+# the Python events that are in the "events" setting cost anything at all.
+HAVE_MONITORING = hasattr(sys, "monitoring")
+MONITORING_TOOL_NAME = "Mathics3-trepan"
+
+# The Python-level events the sys.monitoring backend handles, and the
+# sys.monitoring events that produce each. As with sys.settrace(), a
+# generator resuming is a "call" and a frame yielding or being unwound
+# by an exception is a "return". Line-level events need per-frame local
+# tracing, which step and next rely on, so they go through tracer.
+MONITORING_EVENT_NAMES = {
+    "call": ("PY_START", "PY_RESUME"),
+    "return": ("PY_RETURN", "PY_YIELD", "PY_UNWIND"),
+}
+MONITORING_EVENTS = frozenset(MONITORING_EVENT_NAMES)
+
+# Python-level events, and the subset of those that sys.setprofile()
+# reports. When the "events" setting needs nothing outside of the
+# subset, a profile hook is enough; unlike a trace hook it is not
+# called on every line.
+PYTHON_EVENTS = frozenset(
+    ("call", "return", "line", "exception", "opcode", "c_call", "c_return", "c_exception")
+)
+PROFILE_EVENTS = frozenset(("call", "return", "c_call", "c_return", "c_exception"))
+
+# Events on which a "finish" command can stop.
+FINISH_EVENTS = frozenset(("return", "c_return"))
+
+
+class NullLock:
+    """A stand-in for threading.Lock when only one thread is debugged:
+    acquiring and releasing it does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def acquire(self, *args, **kwargs) -> bool:
+        return True
+
+    def release(self):
+        pass
+
+    pass
+
+
 class DebuggerCore:
     DEFAULT_INIT_OPTS = {
         "processor": None,
@@ -56,6 +149,8 @@ class DebuggerCore:
         # A negative number indicates no eventual stopping.
         "step_ignore": 0,
         "ignore_filter": TraceFilter([tracer, mathics.eval.tracing]),
+        # Set True if more than one thread may be running traced code.
+        "multi_thread": False,
     }
 
     def __init__(self, debugger, opts: Dict[str, Any]={}):
@@ -66,8 +161,7 @@ class DebuggerCore:
         See also `start' and `stop'.
         """
 
-        def get_option(key: str) -> Any:
-            return option_set(opts, key, self.DEFAULT_INIT_OPTS)
+        init_opts = {**self.DEFAULT_INIT_OPTS, **(opts or {})}
 
         self.bpmgr = BreakpointManager()
         self.current_bp = None
@@ -79,11 +173,20 @@ class DebuggerCore:
         self.python_debugger = None
 
         # Threading lock ensures that we don't have other traced threads
-        # running when we enter the debugger. Later we may want to have
-        # a switch to control.
-        self.debugger_lock = threading.Lock()
+        # running when we enter the debugger. Unless the "multi_thread"
+        # option is set, though, there is just one thread to worry about,
+        # and locking would be wasted work.
+        self.debugger_lock = (
+            threading.Lock() if init_opts.get("multi_thread") else NullLock()
+        )
 
-        self.filename_cache = {}
+        # Least-recently-used cache of resolved filenames, bounded by
+        # FILENAME_CACHE_SIZE.
+        self.filename_cache: OrderedDict[str, str] = OrderedDict()
+
+        # (code, resolved filename before pyficache unmapping, whether
+        # that is a pseudo filename), keyed by id(code).
+        self.code_filename_cache: Dict[int, Tuple[types.CodeType, str, bool]] = {}
 
         # Initially the event parameter of the event hook.
         # We can however modify it, such as for breakpoints
@@ -99,18 +202,23 @@ class DebuggerCore:
         # Filenames in co_filename are often relative to this.
         self.main_dirname = os.curdir
 
-        proc_opts = get_option("proc_opts")
+        proc_opts = init_opts.get("proc_opts")
         self.processor = CommandProcessor(self, opts=proc_opts)
         # What events are considered in stepping. Note: 'None' means *all*.
         self.step_events = None
         # How many line events to skip before entering event processor?
         # If stop_level is None all breaks are counted otherwise just
         # those which less than or equal to stop_level.
-        self.step_ignore = get_option("step_ignore")
+        self.step_ignore = init_opts.get("step_ignore")
 
         # We can register specific code to not stop in.
         # Typically this is debugger code like DebugEvaluation.eval()
         self.ignore_code = opts.get("ignore_code", IGNORE_CODE)
+        if self.ignore_code is IGNORE_CODE:
+            # Share the module set so that later add_ignore_code()s show up.
+            self.ignore_code_ids = IGNORE_CODE_IDS
+        else:
+            self.ignore_code_ids = set(id(code) for code in self.ignore_code)
 
         # If stop_level is not None, then we are next'ing or
         # finish'ing and will ignore frames greater than stop_level.
@@ -133,7 +241,11 @@ class DebuggerCore:
         # self.trace_processor = Mtrace.PrintProcessor(self)
 
         # What routines (keyed by f_code) will we not trace into?
-        self.ignore_filter = get_option("ignore_filter")
+        self.ignore_filter = init_opts.get("ignore_filter")
+
+        # (code, ignore_filter.is_excluded() result), keyed by id(code).
+        # add_ignore() and remove_ignore() clear this.
+        self.excluded_code_cache: Dict[int, Tuple[types.CodeType, bool]] = {}
 
         self.search_path = sys.path  # Source filename search path
 
@@ -141,13 +253,65 @@ class DebuggerCore:
         # debugging.
         self.trace_hook_suspend = False
 
-        self.until_condition = get_option("until_condition")
+        self.until_condition = None
+        self.until_code = None
+        self.set_until_condition(init_opts.get("until_condition"))
+
+        # When not None, the sys.monitoring tool id we have claimed.
+        self.monitoring_tool_id = None
+
+        # The options last passed to start().
+        self.start_opts = None
+
+        # True if we have installed _profile_dispatch via sys.setprofile().
+        self.profiling = False
+        self.first_profile_return = False
+        self.profile_event_set = frozenset()
+
+        # Copies of the settings that trace_dispatch() reads on every event.
+        # We keep these up to date if the settings object tells us about
+        # changes; see pymathics.trepan.lib.repl.Settings.
+        self.trace_enabled = False
+        self.print_event_set = None
+        self.trace_event_set = None
+        if debugger is not None:
+            self.refresh_settings_cache()
+            add_listener = getattr(debugger.settings, "add_listener", None)
+            if add_listener is not None:
+                add_listener(self.refresh_settings_cache)
+
+        # Event-specific filtering done in trace_dispatch(), keyed by event name.
+        self.event_filter_fns = {
+            "Get": self._filter_get,
+            "SymPy": self._filter_sympy,
+            "evaluate-entry": self._filter_evaluate_entry,
+            "evaluate-result": self._filter_evaluate_result,
+            "mpmath": self._filter_mpmath,
+        }
+
+        # The evaluate-result filter list last seen, and whether all
+        # of its names are short (have no context part).
+        self.evaluate_result_filter = None
+        self.evaluate_use_short = True
 
         return
 
+    def refresh_settings_cache(self, key=None):
+        """Update our copies of debugger settings. `key` is the name
+        of the setting that changed, or None if that is not known."""
+        settings = self.debugger.settings
+        if key in (None, "trace"):
+            self.trace_enabled = settings.get("trace", False)
+        if key in (None, "printset"):
+            self.print_event_set = interned_event_set(settings.get("printset"))
+        if key in (None, "events"):
+            self.trace_event_set = interned_event_set(settings.get("events"))
+            self._refresh_backend()
+
     def add_ignore(self, *frames_or_fns):
         """Add `frame_or_fn' to the list of functions that are not to
         be debugged"""
+        self.excluded_code_cache.clear()
         for frame_or_fn in frames_or_fns:
             rc = self.ignore_filter.add(frame_or_fn)
             pass
@@ -166,12 +330,24 @@ class DebuggerCore:
         for example when executing "exec cmd".
         """
 
-        if filename == "<" + filename[1:-1] + ">":
+        if is_pseudo_filename(filename):
             return filename
-        canonic = self.filename_cache.get(filename)
-        if not canonic:
-            lead_dir = filename.split(os.sep)[0]
-            if lead_dir == os.curdir or lead_dir == os.pardir:
+        return self._unmap_file(self._resolve_file(filename))
+
+    def _resolve_file(self, filename: str) -> str:
+        """The part of canonic() that turns a real (not <...>) filename
+        into an absolute path; the result is cached in filename_cache."""
+        filename_cache = self.filename_cache
+        canonic = filename_cache.get(filename)
+        if canonic:
+            filename_cache.move_to_end(filename)
+        else:
+            if (
+                filename.startswith(CURDIR_PREFIX)
+                or filename.startswith(PARDIR_PREFIX)
+                or filename == os.curdir
+                or filename == os.pardir
+            ):
                 # We may have invoked the program from a directory
                 # other than where the program resides. filename is
                 # relative to where the program resides. So make sure
@@ -189,17 +365,41 @@ class DebuggerCore:
                     canonic = filename
                 pass
             canonic = osp.realpath(osp.normcase(canonic))
-            self.filename_cache[filename] = canonic
+            filename_cache[filename] = canonic
+            if len(filename_cache) > FILENAME_CACHE_SIZE:
+                filename_cache.popitem(last=False)
+        return canonic
+
+    def _unmap_file(self, filename: str) -> str:
         if pyficache is not None:
             # removing logging can null out pyficache
-            canonic = pyficache.unmap_file(canonic)
-
-        return canonic
+            filename = pyficache.unmap_file(filename)
+        return filename
 
     def canonic_filename(self, frame):
         """Picks out the file name from `frame' and returns its
         canonic() value, a string."""
-        return self.canonic(frame.f_code.co_filename)
+        code = frame.f_code
+        code_filename_cache = self.code_filename_cache
+        cached = code_filename_cache.get(id(code))
+        if cached is None:
+            filename = code.co_filename
+            is_pseudo = is_pseudo_filename(filename)
+            if not is_pseudo:
+                filename = self._resolve_file(filename)
+            if len(code_filename_cache) >= CODE_CACHE_SIZE:
+                code_filename_cache.clear()
+            code_filename_cache[id(code)] = (code, filename, is_pseudo)
+        else:
+            _, filename, is_pseudo = cached
+        # Remappings can change at any time, so unmapping is not cached.
+        return filename if is_pseudo else self._unmap_file(filename)
+
+    def clear_filename_cache(self):
+        """Forget resolved filenames, e.g. because the way filenames
+        are mapped has changed."""
+        self.filename_cache.clear()
+        self.code_filename_cache.clear()
 
     def filename(self, filename=None):
         """Return filename or the basename of that depending on the
@@ -218,15 +418,132 @@ class DebuggerCore:
 
     def is_started(self):
         """Return True if debugging is in progress."""
+        if self.monitoring_tool_id is not None or self.profiling:
+            return not self.trace_hook_suspend
         return (
             tracer.is_started()
             and not self.trace_hook_suspend
             and tracer.find_hook(self.trace_dispatch)
         )
 
+    def _python_event_set(self) -> FrozenSet[str]:
+        """Return the Python-level events in the "events" setting."""
+        return frozenset(self.debugger.settings["events"] or ()) & PYTHON_EVENTS
+
+    def _can_use_monitoring(self) -> bool:
+        """Return True if sys.monitoring can report all of the
+        Python-level events in the "events" setting."""
+        return HAVE_MONITORING and self._python_event_set() <= MONITORING_EVENTS
+
+    def _monitoring_events(self) -> int:
+        """Return the sys.monitoring event set for the Python-level
+        events listed in the "events" setting."""
+        events = sys.monitoring.events
+        event_set = events.NO_EVENTS
+        for event in self._python_event_set():
+            for monitoring_event in MONITORING_EVENT_NAMES.get(event, ()):
+                event_set |= getattr(events, monitoring_event)
+        return event_set
+
+    def _on_monitoring_call(self, code, instruction_offset):
+        self.trace_dispatch(sys._getframe(1), "call", None)
+
+    def _on_monitoring_return(self, code, instruction_offset, retval):
+        self.trace_dispatch(sys._getframe(1), "return", retval)
+
+    def _on_monitoring_unwind(self, code, instruction_offset, exception):
+        # sys.settrace() reports a frame exited by an exception as a
+        # "return" of None.
+        self.trace_dispatch(sys._getframe(1), "return", None)
+
+    def _can_use_setprofile(self) -> bool:
+        """Return True if all of the Python-level events in the "events"
+        setting are reported by sys.setprofile()."""
+        return self._python_event_set() <= PROFILE_EVENTS
+
+    def _profile_dispatch(self, frame, event, arg):
+        # This runs on every Python call and return, so weed out
+        # events we don't care about before doing anything else.
+        if event not in self.profile_event_set:
+            return
+        if event == "return" and self.first_profile_return:
+            # This is start() returning; it isn't part of the debugged program.
+            self.first_profile_return = False
+            return
+        self.trace_dispatch(frame, event, arg)
+
+    def _start_monitoring(self) -> bool:
+        """Register our callbacks with sys.monitoring. Return False if
+        the debugger tool id is in use by someone else."""
+        monitoring = sys.monitoring
+        tool_id = monitoring.DEBUGGER_ID
+        if self.monitoring_tool_id is None:
+            if monitoring.get_tool(tool_id) is not None:
+                return False
+            monitoring.use_tool_id(tool_id, MONITORING_TOOL_NAME)
+            self.monitoring_tool_id = tool_id
+        events = monitoring.events
+        for event, callback in (
+            (events.PY_START, self._on_monitoring_call),
+            (events.PY_RESUME, self._on_monitoring_call),
+            (events.PY_RETURN, self._on_monitoring_return),
+            (events.PY_YIELD, self._on_monitoring_return),
+            (events.PY_UNWIND, self._on_monitoring_unwind),
+        ):
+            monitoring.register_callback(tool_id, event, callback)
+        monitoring.set_events(tool_id, self._monitoring_events())
+        return True
+
+    def _stop_monitoring(self):
+        monitoring = sys.monitoring
+        tool_id = self.monitoring_tool_id
+        events = monitoring.events
+        monitoring.set_events(tool_id, events.NO_EVENTS)
+        for event in (
+            events.PY_START,
+            events.PY_RESUME,
+            events.PY_RETURN,
+            events.PY_YIELD,
+            events.PY_UNWIND,
+        ):
+            monitoring.register_callback(tool_id, event, None)
+        monitoring.free_tool_id(tool_id)
+        self.monitoring_tool_id = None
+
+    def _refresh_backend(self):
+        """The "events" setting has changed. If we are debugging, make
+        the hook we installed deliver the new events, or, if that hook
+        can't, restart with one that can."""
+        if self.monitoring_tool_id is not None:
+            if self._can_use_monitoring():
+                sys.monitoring.set_events(
+                    self.monitoring_tool_id, self._monitoring_events()
+                )
+                return
+        elif self.profiling:
+            # Once events a profile hook doesn't report, like "line",
+            # are wanted, we need tracer's trace hook.
+            if self._can_use_setprofile():
+                self.profile_event_set = self._python_event_set()
+                return
+        else:
+            return
+        self._restart()
+
+    def _restart(self):
+        """Stop and start again with the options last passed to start(),
+        which picks the hook that suits the current settings."""
+        execution_status = self.execution_status
+        trace_hook_suspend = self.trace_hook_suspend
+        self.stop()
+        self.start(self.start_opts)
+        self.execution_status = execution_status
+        self.trace_hook_suspend = trace_hook_suspend
+
     def remove_ignore(self, frame_or_fn):
         """Remove `frame_or_fn' to the list of functions that are not to
         be debugged"""
+        self.excluded_code_cache.clear()
         return self.ignore_filter.remove_include(frame_or_fn)
 
     def start(self, opts=None):
@@ -243,13 +560,31 @@ class DebuggerCore:
         try:
             self.trace_hook_suspend = True
 
-            def get_option(key: str) -> Any:
-                return option_set(opts, key, START_OPTS)
-
-            add_hook_opts = get_option("add_hook_opts")
-
+            # Remembered so that a change to the "events" setting can
+            # restart us the same way; see _refresh_backend().
+            self.start_opts = opts
+            start_opts = {**START_OPTS, **(opts or {})}
+            add_hook_opts = start_opts.get("add_hook_opts")
+            force = start_opts.get("force")
+
+            # Hook placement options and "force" are about tracer's hook
+            # chain, so honor them by going through tracer.
+            tracer_asked_for = force or "add_hook_opts" in (opts or {})
+
+            if (
+                not tracer_asked_for
+                and self._can_use_monitoring()
+                and self._start_monitoring()
+            ):
+                pass
+            elif not tracer_asked_for and self._can_use_setprofile():
+                if not self.profiling:
+                    self.profile_event_set = self._python_event_set()
+                    self.first_profile_return = True
+                    sys.setprofile(self._profile_dispatch)
+                    self.profiling = True
             # Has tracer been started?
-            if not tracer.is_started() or get_option("force"):
+            elif not tracer.is_started() or force:
                 # FIXME: should filter out opts not for tracer
 
                 tracer_start_opts = START_OPTS.copy()
@@ -272,11 +607,16 @@ class DebuggerCore:
         try:
             self.trace_hook_suspend = True
 
-            def get_option(key: str) -> Any:
-                return option_set(options, key, STOP_OPTS)
+            if self.monitoring_tool_id is not None:
+                self._stop_monitoring()
+                return
+            if self.profiling:
+                sys.setprofile(None)
+                self.profiling = False
+                return
 
             args = [self.trace_dispatch]
-            remove = get_option("remove")
+            remove = {**STOP_OPTS, **(options or {})}.get("remove")
             if remove:
                 args.append(remove)
                 pass
@@ -290,19 +630,24 @@ class DebuggerCore:
             self.trace_hook_suspend = False
         return
 
-    def is_break_here(self, frame):
+    def is_break_here(self, frame, event):
+        bpmgr = self.bpmgr
+        bplist = bpmgr.bplist
+        fnlist = bpmgr.fnlist
+        if not bplist and ("call" != event or not fnlist):
+            return False
         filename = self.canonic(frame.f_code.co_filename)
-        if "call" == self.event:
+        if "call" == event:
             find_name = frame.f_code.co_name
             # Could check code object or decide not to
             # The below could be done as a list comprehension, but
             # I'm feeling in Fortran mood right now.
-            for fn in self.bpmgr.fnlist:
+            for fn in fnlist:
                 if fn.__name__ == find_name:
-                    self.current_bp = bp = self.bpmgr.fnlist[fn][0]
+                    self.current_bp = bp = fnlist[fn][0]
                     if bp.temporary:
                         msg = "temporary "
-                        self.bpmgr.delete_breakpoint(bp)
+                        bpmgr.delete_breakpoint(bp)
                     else:
                         msg = ""
                         pass
@@ -311,13 +656,13 @@ class DebuggerCore:
                     return True
                 pass
             pass
-        if (filename, frame.f_lineno) in list(self.bpmgr.bplist.keys()):
-            (bp, clear_bp) = self.bpmgr.find_bp(filename, frame.f_lineno, frame)
+        if (filename, frame.f_lineno) in bplist:
+            (bp, clear_bp) = bpmgr.find_bp(filename, frame.f_lineno, frame)
             if bp:
                 self.current_bp = bp
                 if clear_bp and bp.temporary:
                     msg = "temporary "
-                    self.bpmgr.delete_breakpoint(bp)
+                    bpmgr.delete_breakpoint(bp)
                 else:
                     msg = ""
                     pass
@@ -329,12 +674,28 @@ class DebuggerCore:
             pass
         return False
 
+    def set_until_condition(self, until_condition):
+        """Set the condition that matches_condition() tests, compiling
+        it once here rather than on every event."""
+        self.until_condition = until_condition
+        if not until_condition:
+            self.until_code = None
+            return
+        try:
+            self.until_code = compile(until_condition, "<until>", "eval")
+        except SyntaxError:
+            # matches_condition() treats this as a condition that fails.
+            self.until_code = None
+        return
+
     def matches_condition(self, frame):
         # Conditional bp.
         # Ignore count applies only to those bpt hits where the
         # condition evaluates to true.
+        if self.until_code is None:
+            return False
         try:
-            val = eval(self.until_condition, frame.f_globals, frame.f_locals)
+            val = eval(self.until_code, frame.f_globals, frame.f_locals)
         except Exception:
             # if eval fails, most conservative thing is to
             # stop on breakpoint regardless of ignore count.
@@ -381,7 +742,7 @@ class DebuggerCore:
             elif (
                 self.last_level == self.stop_level
                 and self.stop_on_finish
-                and event in ["return", "c_return"]
+                and event in FINISH_EVENTS
             ):
                 self.stop_level = None
                 self.stop_reason = "in return for 'finish' command"
@@ -396,15 +757,84 @@ class DebuggerCore:
         return False
 
     def _is_step_next_stop(self, event):
-        if self.step_events and event not in self.step_events:
+        # Most of the time we are not stepping at all, so test that first.
+        step_ignore = self.step_ignore
+        if step_ignore < 0:
             return False
-        if self.step_ignore == 0:
+        step_events = self.step_events
+        if step_events and event not in step_events:
+            return False
+        if step_ignore == 0:
             return True
-        elif self.step_ignore > 0:
-            self.step_ignore -= 1
-            pass
+        self.step_ignore = step_ignore - 1
         return False
 
+    # Event filters. Each of these is called with the frame, the
+    # (possibly empty) set of names in event_filters for the event, and
+    # the event argument. They return True if we should go on to the
+    # event processor, and in that case they have set self.arg for
+    # "info program".
+
+    def _filter_mpmath(self, frame, event_filter, arg) -> bool:
+        bound_mpmath_method, call_args = arg
+        mpmath_name = bound_mpmath_method.__func__.__name__
+        # If we have any mpmmath event filters listed, check that
+        # mpmath_name on of the names listed.
+        if event_filter and mpmath_name not in event_filter:
+            return False
+        self.arg = (mpmath_name, bound_mpmath_method, call_args)
+        return True
+
+    def _filter_sympy(self, frame, event_filter, arg) -> bool:
+        sympy_function, call_args = arg
+        sympy_name = sympy_function.__name__
+        # If we have any SymPy event filters listed, check that
+        # sympy_name on of the names listed.
+        if event_filter and sympy_name not in event_filter:
+            return False
+        self.arg = (sympy_name, sympy_function, call_args)
+        return True
+
+    def _filter_get(self, frame, event_filter, arg) -> bool:
+        file_path, call_args = arg
+        if event_filter and file_path not in event_filter:
+            return False
+        self.arg = arg
+        return True
+
+    def _filter_evaluate_result(self, frame, event_filter, arg) -> bool:
+        if id(frame.f_code) in self.ignore_code_ids:
+            return False
+        expr, _, status, orig_expr, _ = arg
+        # If any of the evaluation-result filters uses a short name, then we will take the
+        # short name of the original expression.
+        # TODO: Think about if we should allow short names in event filters or whether we should
+        # always fill those in based on $Context or $ContextPath.
+        if event_filter:
+            # Filter lists get replaced, not changed in place, when
+            # filters are set, so we only need to recompute use_short
+            # when we see a different list.
+            if event_filter is not self.evaluate_result_filter:
+                self.evaluate_result_filter = event_filter
+                self.evaluate_use_short = all("`" not in name for name in event_filter)
+            if orig_expr.get_name(short=self.evaluate_use_short) not in event_filter:
+                return False
+        if skip_trivial_evaluation(expr, status, orig_expr):
+            return False
+        self.arg = arg
+        return True
+
+    def _filter_evaluate_entry(self, frame, event_filter, arg) -> bool:
+        if id(frame.f_code) in self.ignore_code_ids:
+            return False
+        expr, _, status, orig_expr, _ = arg
+        if event_filter and expr.get_name() not in event_filter:
+            return False
+        if skip_trivial_evaluation(expr, status, orig_expr):
+            return False
+        self.arg = arg
+        return True
+
     def trace_dispatch(self, frame, event, arg):
         """A trace event occurred. Filter or pass the information to a
         specialized event processor. Note that there may be more filtering
@@ -412,81 +842,60 @@ class DebuggerCore:
         different line). We could put that here, but since that seems
         processor-specific I think it best to distribute the checks."""
 
-        if self.ignore_filter and self.ignore_filter.is_excluded(frame):
-            return self
-
-        self.event = event
+        # While suspended, for example inside start(), stop(), or a
+        # signal handler, do nothing at all. Returning None also turns
+        # off settrace()-style tracing for the scope.
+        if self.trace_hook_suspend:
+            return None
+
+        if self.ignore_filter:
+            code = frame.f_code
+            excluded_code_cache = self.excluded_code_cache
+            entry = excluded_code_cache.get(id(code))
+            if entry is None:
+                is_excluded = self.ignore_filter.is_excluded(frame)
+                if len(excluded_code_cache) >= CODE_CACHE_SIZE:
+                    excluded_code_cache.clear()
+                excluded_code_cache[id(code)] = (code, is_excluded)
+            else:
+                is_excluded = entry[1]
+            if is_excluded:
+                return self
 
-        if self.debugger.settings["trace"]:
-            print_event_set = self.debugger.settings["printset"]
-            if self.event in print_event_set:
-                self.processor.event_processor(frame, self.event, arg)
+        if self.trace_enabled:
+            if event in self.print_event_set:
+                self.event = event
+                self.arg = arg
+                self.processor.event_processor(frame, event, arg)
                 pass
             pass
 
+        # Weed out events we don't stop for before doing anything
+        # costlier, like evaluating an until condition.
+        trace_event_set = self.trace_event_set
+        if trace_event_set is None or event not in trace_event_set:
+            return self
+
         if self.until_condition:
             if not self.matches_condition(frame):
                 return self
             pass
 
-        trace_event_set = self.debugger.settings["events"]
-        if trace_event_set is None or self.event not in trace_event_set:
-            return self
-
         event_filter = event_filters.get(event)
 
-        # Update arg to let user see details of callback
-        # in "info program"
-        self.arg = arg
-
         if event_filter is not None:
-            if event == "mpmath" and event_filter:
-                bound_mpmath_method, call_args = arg
-                mpmath_name = bound_mpmath_method.__func__.__name__
-                # If we have any mpmmath event filters listed, check that
-                # mpmath_name on of the names listed.
-                if mpmath_name not in event_filter and event_filter:
-                    return
-                self.arg = (mpmath_name, bound_mpmath_method, call_args)
-                pass
-            elif event == "SymPy":
-                sympy_function, call_args = arg
-                sympy_name = sympy_function.__name__
-                # If we have any SymPy event filters listed, check that
-                # sympy_name on of the names listed.
-                if sympy_name not in event_filter and event_filter:
-                    return
-                self.arg = (sympy_name, sympy_function, call_args)
-            elif event == "Get":
-                file_path, call_args = arg
-                if file_path not in event_filter and event_filter:
-                    return
-            elif event == "evaluate-result":
-                if frame.f_code in self.ignore_code:
-                    return
-                expr, _, status, orig_expr, _ = arg
-                # If any of the evaluation-result filters uses a short name, then we will take the
-                # short name of the original expression.
-                # TODO: Think about if we should allow short names in event filters or whether we should
-                # always fill those in based on $Context or $ContextPath.
-                use_short = all(name.find("`") == -1 for name in event_filter)
-                if event_filter and orig_expr.get_name(short=use_short) not in event_filter:
-                    return
-                if skip_trivial_evaluation(expr, status, orig_expr):
-                    return
-            elif event == "evaluate-entry":
-                if frame.f_code in self.ignore_code:
-                    return
-                expr, _, status, orig_expr, _ = arg
-                if event_filter and expr.get_name() not in event_filter:
-                    return
-                if skip_trivial_evaluation(expr, status, orig_expr):
-                    return
-
-            else:
+            filter_fn = self.event_filter_fns.get(event)
+            if filter_fn is None:
                 print(f"FIXME: Unhandled event {event}")
                 return
+            if not filter_fn(frame, event_filter, arg):
+                return
+        else:
+            # Update arg to let user see details of callback
+            # in "info program"
+            self.arg = arg
 
+        self.event = event
         return self.processor.event_processor(frame, event, arg)
 
     pass
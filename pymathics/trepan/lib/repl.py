@@ -22,6 +22,7 @@ This module contains the ``DebugREPL`` class
 
 import os
 import sys
+import weakref
 
 from term_background import is_dark_background
 from typing import Any
@@ -38,7 +39,7 @@ from pymathics.trepan.lib.core import DebuggerCore
 from trepan.misc import option_set
 
 # Set to ignore entry and exit calls to Mathics3 DebugEvaluation[]
-pymathics.trepan.lib.core.IGNORE_CODE.add(DebugEvaluation.eval.__code__)
+pymathics.trepan.lib.core.add_ignore_code(DebugEvaluation.eval.__code__)
 
 is_dark_bg = is_dark_background()
 
@@ -60,6 +61,88 @@ except ImportError:
     pass
 
 
+class Settings(dict):
+    """
+    Debugger settings: a dictionary that calls the listeners added with
+    ``add_listener()`` with the setting name whenever a setting changes,
+    or with None when the change may involve several settings. This lets
+    code on hot paths keep copies of the settings it needs.
+
+    Set values, like the "events" setting, are stored as frozensets, so
+    that changing one means assigning a new value, which listeners hear
+    about.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        # Weak references to bound methods, so that a debugger core or
+        # command processor isn't kept alive only by its settings.
+        self._listeners = []
+        super().update(
+            (key, self._frozen(value)) for key, value in dict(*args, **kwargs).items()
+        )
+
+    @staticmethod
+    def _frozen(value):
+        return frozenset(value) if isinstance(value, set) else value
+
+    def add_listener(self, listener):
+        """Call bound method `listener` with the setting name on changes."""
+        self._listeners.append(weakref.WeakMethod(listener))
+
+    def _notify(self, key):
+        live_listeners = []
+        for listener_ref in self._listeners:
+            listener = listener_ref()
+            if listener is not None:
+                listener(key)
+                live_listeners.append(listener_ref)
+        self._listeners = live_listeners
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, self._frozen(value))
+        self._notify(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._notify(key)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        super().clear()
+        self._notify(None)
+
+    def pop(self, key, *default):
+        had_key = key in self
+        value = super().pop(key, *default)
+        if had_key:
+            self._notify(key)
+        return value
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._notify(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        super().update(
+            (key, self._frozen(value)) for key, value in dict(*args, **kwargs).items()
+        )
+        self._notify(None)
+
+    def copy(self):
+        return Settings(self)
+
+
 class DebugREPL:
     """
     Class for a Debugger REPL.
@@ -81,7 +164,7 @@ class DebugREPL:
 
         self.thread = None
         self.eval_string = None
-        self.settings = DEBUGGER_SETTINGS.copy()
+        self.settings = Settings(DEBUGGER_SETTINGS)
         self.settings["events"] = {
             "Get",  # Get[]
             "SymPy",  # SymPy call
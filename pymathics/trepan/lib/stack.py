@@ -18,8 +18,9 @@
 
 import inspect
 import os.path as osp
+import sys
 
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 from trepan.lib.format import (
     Arrow,
     Function,
@@ -40,23 +41,49 @@ from mathics.core.pattern import ExpressionPattern
 from pymathics.trepan.lib.format import format_element, pygments_format
 
 
+# Names we test for on every frame formatted. Interning them lets string
+# comparison succeed on the identity check when the other side is
+# interned too. We still use == and not "is", since strings coming from
+# frames are not guaranteed to be interned.
+_MODULE = sys.intern("<module>")
+_RETURN = sys.intern("__return__")
+
+# Formatted function names and parameters, keyed by frame, frame offset,
+# style and maximum argument string size. Entries are made only while the
+# command processor says frame_args_cacheable, that is, while it is running
+# a command with the debugged program stopped, and it calls
+# clear_arg_cache() after each command.
+FUNCTION_AND_PARAMETERS_CACHE_SIZE = 256
+_function_and_parameters_cache: Dict[tuple, Tuple[bool, str]] = {}
+
+
+def clear_arg_cache():
+    """Forget previously formatted function names and parameters"""
+    _function_and_parameters_cache.clear()
+
+
 def count_frames(frame, count_start=0):
     """Return a count of the number of frames"""
     count = -count_start
-    while frame:
+    while frame is not None:
         count += 1
         frame = frame.f_back
     return count
 
 
 def format_frame_self_arg(
-    frame, args, debugger, style: str
+    frame, args, debugger, style: str, local_vars: Optional[dict] = None
 ) -> Optional[str]:
     """If there is a "self" argument and it is is a Mathics3 kind of
     object, format that separately as its Mathics3 representation (as
     opposed to how it looks in Python).
+
+    If the caller already has ``frame.f_locals``, it can pass that in
+    ``local_vars`` so we don't take another snapshot of the locals.
     """
-    self_arg = frame.f_locals.get("self", None)
+    if local_vars is None:
+        local_vars = frame.f_locals
+    self_arg = local_vars.get("self", None)
     if self_arg is None:
         return None
     if (
@@ -77,10 +104,24 @@ def format_function_and_parameters(frame, debugger, style: str) -> Tuple[bool, s
     The style to used is given by ``style``; style "none" means do not style.
     We also pass back wither the frame function is a module-level function.
     """
+    proc = getattr(getattr(debugger, "core", None), "processor", None)
+    if not getattr(proc, "frame_args_cacheable", False):
+        return _format_function_and_parameters(frame, debugger, style)
+
+    key = (frame, frame.f_lasti, style, debugger.settings["maxargstrsize"])
+    result = _function_and_parameters_cache.get(key)
+    if result is None:
+        result = _format_function_and_parameters(frame, debugger, style)
+        if len(_function_and_parameters_cache) >= FUNCTION_AND_PARAMETERS_CACHE_SIZE:
+            _function_and_parameters_cache.clear()
+        _function_and_parameters_cache[key] = result
+    return result
 
+
+def _format_function_and_parameters(frame, debugger, style: str) -> Tuple[bool, str]:
     funcname, s = format_function_name(frame, style)
     args, varargs, varkw, local_vars = inspect.getargvalues(frame)
-    if "<module>" == funcname and (
+    if _MODULE == funcname and (
         [],
         None,
         None,
@@ -101,7 +142,9 @@ def format_function_and_parameters(frame, debugger, style: str) -> Tuple[bool, s
             pass
     else:
         is_module = False
-        self_arg_mathics_formatted = format_frame_self_arg(frame, args, debugger, style)
+        self_arg_mathics_formatted = format_frame_self_arg(
+            frame, args, debugger, style, local_vars
+        )
 
         if self_arg_mathics_formatted is not None:
             args = args[1:]
@@ -128,8 +171,8 @@ def format_function_and_parameters(frame, debugger, style: str) -> Tuple[bool, s
                         params = params[1:]
                     # We have to do this before pygments_format so that it appears before a \n'
                     self_arg_mathics_formatted += ","
-                first_param = "(" + pygments_format(
-                    self_arg_mathics_formatted, style=style
+                first_param = (
+                    f"({pygments_format(self_arg_mathics_formatted, style=style)}"
                 )
                 if param_len > 0:
                     first_param += "\t"
@@ -184,22 +227,26 @@ def format_stack_entry(
     frame, line_number = frame_lineno
 
     if is_builtin_eval_fn(frame):
-        s = format_eval_builtin_fn(frame, style=style)
-        s += "    "
+        parts = [format_eval_builtin_fn(frame, style=style), "    "]
         is_module = False
     else:
         is_module, s = format_function_and_parameters(frame, dbg_obj, style)
-        args, varargs, varkw, local_vars = inspect.getargvalues(frame)
+        parts = [s]
 
         # Note: ddd can't handle wrapped stack entries (yet).
         # The 35 is hoaky though. FIXME.
         if len(s) >= 35:
-            s += "\n    "
-
-    s += format_return_and_location(
-        frame, line_number, dbg_obj, is_module, include_location, style
-    )
-    return s
+            parts.append("\n    ")
+
+    # Without a location, all that format_return_and_location() adds is a
+    # return value. Skip the call when there is none.
+    if include_location or _RETURN in frame.f_locals:
+        parts.append(
+            format_return_and_location(
+                frame, line_number, dbg_obj, is_module, include_location, style
+            )
+        )
+    return "".join(parts)
 
 
 def is_builtin_eval_fn(frame) -> bool:
@@ -225,13 +272,13 @@ def print_expression_stack(proc_obj, count: int, style="none"):
     """
     j = 0
     intf = proc_obj.intf[-1]
-    n = len(proc_obj.stack)
-    for i in range(n):
-        frame_lineno = proc_obj.stack[len(proc_obj.stack) - i - 1]
+    curframe = proc_obj.curframe
+    debugger = proc_obj.debugger
+    for i, frame_lineno in enumerate(reversed(proc_obj.stack)):
         frame = frame_lineno[0]
         self_obj = frame.f_locals.get("self", None)
         if isinstance(self_obj, Expression):
-            if frame is proc_obj.curframe:
+            if frame is curframe:
                 intf.msg_nocr(format_token(Arrow, "E>", style=style))
             else:
                 intf.msg_nocr("E:")
@@ -239,7 +286,7 @@ def print_expression_stack(proc_obj, count: int, style="none"):
             intf.msg(f"{stack_nums} {frame.f_code.co_qualname} {self_obj.__class__}")
             intf.msg(
                 " " * (4 + len(stack_nums))
-                + format_stack_entry(proc_obj.debugger, frame_lineno, style=style)
+                + format_stack_entry(debugger, frame_lineno, style=style)
             )
             j += 1
             if j >= count:
@@ -252,12 +299,11 @@ def print_builtin_stack(proc_obj, count: int, style="none"):
     """
     j = 0
     intf = proc_obj.intf[-1]
-    n = len(proc_obj.stack)
-    for i in range(n):
-        frame_lineno = proc_obj.stack[len(proc_obj.stack) - i - 1]
-        frame, line_number = frame_lineno
+    curframe = proc_obj.curframe
+    debugger = proc_obj.debugger
+    for i, (frame, line_number) in enumerate(reversed(proc_obj.stack)):
         if is_builtin_eval_fn(frame):
-            if frame is proc_obj.curframe:
+            if frame is curframe:
                 intf.msg_nocr(format_token(Arrow, "B>", style=style))
             else:
                 intf.msg_nocr("B:")
@@ -266,24 +312,29 @@ def print_builtin_stack(proc_obj, count: int, style="none"):
             intf.msg(
                 " " * (4 + len(stack_nums))
                 + format_return_and_location(
-                    frame, line_number, proc_obj.debugger, False, True, style
-                     ))
+                    frame, line_number, debugger, False, True, style
+                )
+            )
             j += 1
             if j >= count:
                 break
 
 
-def print_stack_entry(proc_obj, i_stack: int, style="none", opts={}):
+def _format_stack_entry_for_trace(proc_obj, i_stack: int, style="none") -> str:
+    """Return stack entry ``i_stack`` as shown in a backtrace, with its
+    "->" or "##" marker and its position."""
     frame_lineno = proc_obj.stack[len(proc_obj.stack) - i_stack - 1]
     frame, _ = frame_lineno
-    intf = proc_obj.intf[-1]
     if frame is proc_obj.curframe:
-        intf.msg_nocr(format_token(Arrow, "->", style=style))
+        marker = format_token(Arrow, "->", style=style)
     else:
-        intf.msg_nocr("##")
-    intf.msg(
-        f"{i_stack} {format_stack_entry(proc_obj.debugger, frame_lineno, style=style)}"
-    )
+        marker = "##"
+    entry = format_stack_entry(proc_obj.debugger, frame_lineno, style=style)
+    return f"{marker}{i_stack} {entry}"
+
+
+def print_stack_entry(proc_obj, i_stack: int, style="none", opts={}):
+    proc_obj.intf[-1].msg(_format_stack_entry_for_trace(proc_obj, i_stack, style))
 
 
 def print_stack_trace(proc_obj, count=None, style="none", opts={}):
@@ -298,8 +349,15 @@ def print_stack_trace(proc_obj, count=None, style="none", opts={}):
         elif opts["expression"]:
             print_expression_stack(proc_obj, n, style=style)
         else:
-            for i in range(n):
-                print_stack_entry(proc_obj, i, style=style, opts=opts)
+            # Format everything first and write it out in one go.
+            lines = []
+            try:
+                for i in range(n):
+                    lines.append(_format_stack_entry_for_trace(proc_obj, i, style))
+            finally:
+                # On an interrupt, still show what we have so far.
+                if lines:
+                    proc_obj.intf[-1].msg("\n".join(lines))
     except KeyboardInterrupt:
         pass
     return
@@ -309,15 +367,15 @@ def print_dict(s, obj, title):
     if hasattr(obj, "__dict__"):
         d = obj.__dict__
         if isinstance(d, dict):
-            keys = list(d.keys())
+            keys = sorted(d.keys())
             if len(keys) == 0:
-                s += f"\n  No {title}"
+                parts = [f"\n  No {title}"]
             else:
-                s += f"\n  {title}:\n"
-            keys.sort()
+                parts = [f"\n  {title}:\n"]
             for key in keys:
-                s += f"    '{key}':\t{d[key]}\n"
+                parts.append(f"    '{key}':\t{d[key]}\n")
                 pass
+            s += "".join(parts)
             pass
         pass
     return s
@@ -334,7 +392,7 @@ def eval_print_obj(arg, frame, format=None, short=False):
             val = eval(arg, frame.f_globals, frame.f_locals)
             pass
     except Exception:
-        return 'No symbol "' + arg + '" in current context.'
+        return f'No symbol "{arg}" in current context.'
 
     return print_obj(arg, val, format, short)
 
@@ -343,7 +401,9 @@ def print_obj(arg, val, format=None, short=False):
     """Return a string representation of an object"""
     what = arg
     if format:
-        what = format + " " + arg
+        from trepan.lib.printing import printf
+
+        what = f"{format} {arg}"
         val = printf(val, format)
         pass
     s = f"{what} = {val}"
@@ -385,6 +445,28 @@ if __name__ == "__main__":
         osp.dirname(__file__), "__pycache__", osp.basename(__file__)[:-3] + ".pyc"
     )
 
+    class MockInterface:
+        def msg(self, msg):
+            print(msg)
+
+        def msg_nocr(self, msg):
+            print(msg, end="")
+
+        pass
+
+    class MockProcessor:
+        def __init__(self, debugger, frame):
+            self.debugger = debugger
+            self.curframe = frame
+            self.intf = [MockInterface()]
+            self.stack = []
+            while frame is not None:
+                self.stack.append((frame, frame.f_lineno))
+                frame = frame.f_back
+            self.stack.reverse()
+
+        pass
+
     m = MockDebugger()
     print(
         format_stack_entry(
@@ -395,11 +477,22 @@ if __name__ == "__main__":
             ),
         )
     )
+
+    # Printing a backtrace should never drop us into a nested debugger.
+    import trepan.api
+
+    def no_nested_debug(*args, **kwargs):
+        raise RuntimeError("print_stack_trace() entered a nested debugger")
+
+    trepan.api.debug = no_nested_debug
+    print_stack_trace(
+        MockProcessor(m, frame), opts={"builtin": False, "expression": False}
+    )
     # print(format_stack_entry(m, (frame, 10,), color="dark"))
-    # print("frame count: %d" % count_frames(frame))
-    # print("frame count: %d" % count_frames(frame.f_back))
-    # print("frame count: %d" % count_frames(frame, 1))
-    # print("def statement: x=5?: %s" % repr(is_def_stmt("x=5", frame)))
+    # print(f"frame count: {count_frames(frame)}")
+    # print(f"frame count: {count_frames(frame.f_back)}")
+    # print(f"frame count: {count_frames(frame, 1)}")
+    # print(f"def statement: x=5?: {is_def_stmt('x=5', frame)!r}")
     # # Not a "def" statement because frame is wrong spot
     # print(is_def_stmt("def foo():", frame))
 
@@ -15,6 +15,7 @@
 #
 #   You should have received a copy of the GNU General Public License
 #   along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import hashlib
 import importlib
 import inspect
 import linecache
@@ -22,13 +23,13 @@ import os.path as osp
 import re
 import shlex
 import sys
-import tempfile
-import traceback
+from collections import OrderedDict
+from functools import lru_cache
 
 # Note: the module name pre 3.2 is repr
 from reprlib import Repr
-from types import FrameType
-from typing import Tuple
+from types import CodeType, FrameType, MappingProxyType
+from typing import Dict, List, Optional, Tuple
 
 import pyficache
 import trepan.lib.display as Mdisplay
@@ -50,10 +51,132 @@ from trepan.vprocessor import Processor
 
 from pymathics.trepan.lib.exception import DebuggerQuitException
 from pymathics.trepan.lib.location import format_as_file_line
-from pymathics.trepan.lib.stack import format_eval_builtin_fn, is_builtin_eval_fn
+from pymathics.trepan.lib.stack import (
+    clear_arg_cache,
+    format_eval_builtin_fn,
+    is_builtin_eval_fn,
+)
+from pymathics.trepan.processor.command.base_cmd import find_command_classes
 from pymathics.trepan.tracing import call_event_debug
 
-warned_file_mismatches = set()
+# readline is not available everywhere, e.g. on Windows. Find out once
+# rather than on each history-file read or write.
+try:
+    import readline as _readline
+except ImportError:
+    _readline = None
+
+# Short, two-character names for events shown in location lines. These
+# are tracer's names plus those for the Mathics3 events. Processors share
+# this, so it is read only.
+MATHICS_EVENT2SHORT = MappingProxyType(
+    {
+        **EVENT2SHORT,
+        "signal": "?!",
+        "apply": "@@",
+        "evalMethod": "@m",
+        "evaluate-entry": "@e",
+        "evaluate-result": "e@",
+        "evalFunction": "@f",
+        "brkpt": "xx",
+        "debugger": "$ ",
+        "interrupt": "^C",
+        "mpmath": "mp",
+        "SymPy": "SP",
+        "Get": "<<",
+    }
+)
+
+# Events whose argument holds a Mathics3 expression being evaluated, and
+# events that have a value to show as they leave a frame.
+EVALUATE_EVENTS = frozenset(("evaluate-entry", "evaluate-result"))
+RETURN_EVENTS = frozenset(("return", "exception"))
+
+# Types whose repr() is always short enough that reprlib.Repr would
+# leave it alone.
+SHORT_REPR_TYPES = frozenset((bool, float, type(None)))
+
+# The most filenames a CommandProcessor remembers having warned about
+# not matching their frame's code.
+WARNED_FILE_MISMATCHES_SIZE = 1024
+
+# Python names the source of modules frozen into the interpreter
+# "<frozen module-name>".
+_re_frozen = re.compile(r"^<frozen (.*)>")
+
+
+# (module name, class) for each debugger command class, found by
+# CommandProcessor._populate_commands() the first time it is run.
+# Reloading a command module clears this; see clear_command_classes().
+_command_classes: Optional[List[Tuple[str, type]]] = None
+
+
+def clear_command_classes():
+    """Forget the debugger command classes found so far, so that the
+    next CommandProcessor looks them up again, e.g. after a command
+    module has been reloaded."""
+    global _command_classes
+    _command_classes = None
+
+
+# Temporary files print_location() has written source text to, keyed by
+# the name of the file the text came from and the SHA-1 digest of the
+# text, least recently used first.
+TEMPFILE_CACHE_SIZE = 256
+_tempfile_cache: OrderedDict[Tuple[str, bytes], str] = OrderedDict()
+
+# pyficache.remap_file_pat() results keyed by filename. The patterns
+# only change via CommandProcessor.add_remap_pat(), which clears this.
+_remap_pat_cache: Dict[str, Optional[str]] = {}
+
+
+def remap_file_pat_cached(filename: str) -> Optional[str]:
+    """Memoized pyficache.remap_file_pat() using pyficache's current
+    remap patterns."""
+    if filename in _remap_pat_cache:
+        return _remap_pat_cache[filename]
+    remapped_file = pyficache.remap_file_pat(filename, pyficache.main.remap_re_hash)
+    _remap_pat_cache[filename] = remapped_file
+    return remapped_file
+
+
+@lru_cache(maxsize=128)
+def tempfile_prefix(filename: str) -> str:
+    """Return the part of `filename`'s basename before its first ".",
+    for use as the prefix of a temporary copy of that file."""
+    return osp.basename(filename).partition(".")[0]
+
+
+@lru_cache(maxsize=256)
+def compile_cached(source: str, filename: str = "<string>", mode: str = "eval"):
+    """Like compile(), but remembers recent results. Debugger commands
+    often evaluate the same short strings over and over.
+
+    Unlike eval() on a string, compile() in "eval" mode does not skip
+    leading spaces and tabs, so callers should strip those first."""
+    return compile(source, filename, mode)
+
+
+# (code, deparse_fn() result) keyed by id(code), least recently used
+# first. Holding on to the code object keeps its id from being reused
+# while the entry is there.
+DEPARSE_CACHE_SIZE = 64
+_deparse_cache: OrderedDict[int, Tuple[CodeType, str]] = OrderedDict()
+
+
+def deparse_fn_cached(code: CodeType) -> str:
+    """Memoized deparse_fn(). Deparsing is slow, and a code object's
+    source text never changes."""
+    entry = _deparse_cache.get(id(code))
+    if entry is not None:
+        _deparse_cache.move_to_end(id(code))
+        return entry[1]
+    source_text = deparse_fn(code)
+    if source_text is not None:
+        _deparse_cache[id(code)] = (code, source_text)
+        if len(_deparse_cache) > DEPARSE_CACHE_SIZE:
+            _deparse_cache.popitem(last=False)
+    return source_text
 
 
 def get_srcdir():
@@ -61,6 +184,12 @@ def get_srcdir():
     return osp.realpath(filename)
 
 
+# Characters that make arg_split() need shlex: quotes, escapes,
+# comments, and anything other than printable ASCII and shlex's white
+# space.
+_re_arg_split_special = re.compile(r"""["'\\#]|[^ \t\r\n!-~]""")
+
+
 # arg_split culled from ipython's routine
 def arg_split(s, posix=False):
     """Split a command line's arguments in a shell-like manner returned
@@ -72,20 +201,31 @@ def arg_split(s, posix=False):
     in inputs are respected.
     """
 
-    args_list = [[]]
     if isinstance(s, bytes):
         s = s.decode("utf-8")
-    lex = shlex.shlex(s, posix=posix)
+    if not _re_arg_split_special.search(s):
+        # Nothing that shlex would treat specially, so splitting on
+        # white space gives the same result, and much faster.
+        args = s.split()
+    else:
+        lex = shlex.shlex(s, posix=posix)
+        lex.whitespace_split = True
+        args = list(lex)
+        pass
+
+    if ";;" not in args:
+        return [args]
 
-    lex.whitespace_split = True
-    args = list(lex)
-    for arg in args:
+    # Slice out the commands between ";;" separators.
+    args_list = []
+    start = 0
+    for i, arg in enumerate(args):
         if ";;" == arg:
-            args_list.append([])
-        else:
-            args_list[-1].append(arg)
+            args_list.append(args[start:i])
+            start = i + 1
             pass
         pass
+    args_list.append(args[start:])
     return args_list
 
 
@@ -96,16 +236,11 @@ def get_mathics_stack(f, proc_obj=None) -> Tuple[list, int]:
     sebugger. Also we will add traceback frame on top if that
     exists."""
 
-    def false_fn(f):
-        return false_fn
-
-    def fn_is_ignored(f):
-        return proc_obj.core.ignore_filter.is_included(f)
-
-    # TODO filter frames
+    # TODO filter frames, e.g. with proc_obj.core.ignore_filter.is_included()
     stack = []
+    append = stack.append
     while f is not None:
-        stack.append((f, f.f_lineno))
+        append((f, f.f_lineno))
         f = f.f_back
         pass
     stack.reverse()
@@ -117,7 +252,7 @@ def print_event_location(proc_obj):
     """Show a location based on an event type."""
     event_arg = proc_obj.event_arg
     event = proc_obj.event
-    if event in ("evaluate-entry", "evaluate-result"):
+    if event in EVALUATE_EVENTS:
         expr, evaluation, status, orig_expr, _ = event_arg
         print_evaluate(expr, evaluation, status, proc_obj.frame, orig_expr)
 
@@ -137,7 +272,7 @@ def print_location(proc_obj):
     dbgr_obj = proc_obj.debugger
     intf_obj = dbgr_obj.intf[-1]
 
-    if proc_obj.event in ("evaluate-entry", "evaluate-result"):
+    if proc_obj.event in EVALUATE_EVENTS:
         event_arg = proc_obj.event_arg
         if isinstance(event_arg, tuple) and len(event_arg) > 0:
             event_arg = event_arg[0]
@@ -152,6 +287,16 @@ def print_location(proc_obj):
     # once and sometimes twice.
     remapped_file = None
     source_text = None
+
+    # Settings don't change while we are in here, so look them up once.
+    tempdir = proc_obj.settings("tempdir")
+    opts = {
+        "reload_on_change": proc_obj.settings("reload"),
+        "output": proc_obj.settings("highlight"),
+    }
+    if "style" in dbgr_obj.settings:
+        opts["style"] = proc_obj.settings("style")
+
     while i_stack >= 0 and len(proc_obj.stack) > 0:
         frame, lineno = proc_obj.stack[i_stack]
 
@@ -170,7 +315,9 @@ def print_location(proc_obj):
         #             if self.run == frame.f_locals['breadcrumb']:
         #                 break
 
-        filename = Mstack.frame2file(core_obj, frame, canonic=False)
+        # This is what Mstack.frame2file(core_obj, frame, canonic=False)
+        # does, without the extra call.
+        filename = core_obj.filename(frame.f_code.co_filename)
         if "<string>" == filename and dbgr_obj.eval_string:
             remapped_file = filename
             filename = pyficache.unmap_file(filename)
@@ -178,18 +325,18 @@ def print_location(proc_obj):
                 remapped = cmdfns.source_tempfile_remap(
                     "eval_string",
                     dbgr_obj.eval_string,
-                    tempdir=proc_obj.settings("tempdir"),
+                    tempdir=tempdir,
                 )
                 pyficache.remap_file(filename, remapped)
                 filename, lineno = pyficache.unmap_file_line(filename, lineno)
                 pass
             pass
         elif "<string>" == filename:
-            source_text = deparse_fn(frame.f_code)
+            source_text = deparse_fn_cached(frame.f_code)
             filename = f"<string: '{source_text}'>"
             pass
         else:
-            m = re.search("^<frozen (.*)>", filename)
+            m = _re_frozen.match(filename)
             if m and m.group(1) in pyficache.file2file_remap:
                 remapped_file = pyficache.file2file_remap[m.group(1)]
                 pass
@@ -201,23 +348,15 @@ def print_location(proc_obj):
                     pass
                 pass
             elif pyficache.main.remap_re_hash:
-                remapped_file = pyficache.remap_file_pat(
-                    filename, pyficache.main.remap_re_hash
-                )
+                remapped_file = remap_file_pat_cached(filename)
             elif m and m.group(1) in sys.modules:
                 remapped_file = m.group(1)
                 pyficache.remap_file(filename, remapped_file)
             pass
 
-        opts = {
-            "reload_on_change": proc_obj.settings("reload"),
-            "output": proc_obj.settings("highlight"),
-        }
-
-        if "style" in proc_obj.debugger.settings:
-            opts["style"] = proc_obj.settings("style")
-
-        pyficache.update_cache(filename)
+        if filename != proc_obj.last_updated_file:
+            pyficache.update_cache(filename)
+            proc_obj.last_updated_file = filename
         line = pyficache.getline(filename, lineno, opts)
         if not line:
             if (
@@ -229,7 +368,6 @@ def print_location(proc_obj):
                 # Deparse the code object into a temp file and remap the line from code
                 # into the corresponding line of the tempfile
                 co = proc_obj.curframe.f_code
-                tempdir = proc_obj.settings("tempdir")
                 temp_filename, name_for_code = deparse_and_cache(
                     co, proc_obj.errmsg, tempdir=tempdir
                 )
@@ -241,33 +379,58 @@ def print_location(proc_obj):
 
             else:
                 # FIXME:
+                # source_chunks is a tuple of the bytes to write out.
                 if source_text:
-                    lines = source_text.split("\n")
+                    source_chunks = (source_text.encode("utf-8"),)
                     temp_name = "string-"
-                else:
-                    # try with good ol linecache and consider fixing pyficache
-                    lines = linecache.getlines(filename)
+                elif osp.isfile(filename):
+                    # Copy the file as is, rather than reading it
+                    # into lines only to join them back up again.
+                    with open(filename, "rb") as source_file:
+                        source_chunks = (source_file.read(),)
                     temp_name = filename
-                if lines:
-                    # FIXME: DRY code with version in cmdproc.py print_location
-                    prefix = osp.basename(temp_name).split(".")[0]
-                    fd = tempfile.NamedTemporaryFile(
-                        suffix=".py",
-                        prefix=prefix,
-                        delete=False,
-                        dir=proc_obj.settings("tempdir"),
+                else:
+                    # try with good ol linecache and consider fixing pyficache.
+                    # Encode line by line rather than building the whole
+                    # text as one string and then again as bytes.
+                    source_chunks = tuple(
+                        line.encode("utf-8") for line in linecache.getlines(filename)
                     )
-                    with fd:
-                        fd.write("".join(lines).encode("utf-8"))
-                        remapped_file = fd.name
-                        pyficache.remap_file(remapped_file, filename)
-                    fd.close()
+                    temp_name = filename
+                if any(source_chunks):
+                    # Reuse the temporary file from an earlier stop if
+                    # it has the same contents and is still around.
+                    digest = hashlib.sha1()
+                    for chunk in source_chunks:
+                        digest.update(chunk)
+                    tempfile_key = (filename, digest.digest())
+                    remapped_file = _tempfile_cache.get(tempfile_key)
+                    if remapped_file is not None and osp.exists(remapped_file):
+                        _tempfile_cache.move_to_end(tempfile_key)
+                    else:
+                        import tempfile
+
+                        # FIXME: DRY code with version in cmdproc.py print_location
+                        fd = tempfile.NamedTemporaryFile(
+                            suffix=".py",
+                            prefix=tempfile_prefix(temp_name),
+                            delete=False,
+                            dir=tempdir,
+                        )
+                        with fd:
+                            fd.writelines(source_chunks)
+                            remapped_file = fd.name
+                        fd.close()
+                        _tempfile_cache[tempfile_key] = remapped_file
+                        if len(_tempfile_cache) > TEMPFILE_CACHE_SIZE:
+                            _tempfile_cache.popitem(last=False)
+                    pyficache.remap_file(remapped_file, filename)
                     intf_obj.msg(f"remapped file {filename} to {remapped_file}")
 
                     pass
             line = linecache.getline(filename, lineno, proc_obj.curframe.f_globals)
             if not line:
-                m = re.search("^<frozen (.*)>", filename)
+                m = _re_frozen.match(filename)
                 if m and m.group(1):
                     remapped_file = m.group(1)
                     try_module = sys.modules.get(remapped_file)
@@ -293,9 +456,8 @@ def print_location(proc_obj):
         try:
             match, reason = Mstack.check_path_with_frame(frame, filename)
             if not match:
-                if filename not in warned_file_mismatches:
+                if proc_obj.warn_file_mismatch_once(filename):
                     proc_obj.errmsg(reason)
-                    warned_file_mismatches.add(filename)
         except Exception:
             pass
 
@@ -326,7 +488,7 @@ def print_location(proc_obj):
             break
         pass
 
-    if proc_obj.event in ["return", "exception"]:
+    if proc_obj.event in RETURN_EVENTS:
         val = proc_obj.event_arg
         intf_obj.msg(f"R=> {proc_obj._saferepr(val)}")
         pass
@@ -397,7 +559,9 @@ def resolve_name(obj, command_name):
 
 
 def run_hooks(obj, hooks, *args) -> bool:
-    """Run each function in `hooks' with args"""
+    """Run each function in `hooks' with args. `hooks' can be any
+    iterable, such as the insertion-ordered hook dicts of
+    CommandProcessor."""
     for hook in hooks:
         if hook(obj, *args):
             return True
@@ -423,42 +587,57 @@ class CommandProcessor(Processor):
         super().__init__(core_obj)
 
         self.continue_running = False  # True if we should leave command loop
-        self.event2short = dict(EVENT2SHORT)
-        self.event2short["signal"] = "?!"
-        self.event2short["apply"] = "@@"
-        self.event2short["evalMethod"] = "@m"
-        self.event2short["evaluate-entry"] = "@e"
-        self.event2short["evaluate-result"] = "e@"
-        self.event2short["evalFunction"] = "@f"
-        self.event2short["brkpt"] = "xx"
-        self.event2short["debugger"] = "$ "
-        self.event2short["interrupt"] = "^C"
-        self.event2short["mpmath"] = "mp"
-        self.event2short["SymPy"] = "SP"
-        self.event2short["Get"] = "<<"
+        self.event2short = MATHICS_EVENT2SHORT
 
         self.optional_modules = tuple()
+
+        # Copy of the "autoeval" setting, which process_command() checks
+        # for each command name it does not know. We keep it up to date
+        # if the settings object tells us about changes; see
+        # pymathics.trepan.lib.repl.Settings.
+        self._autoeval = bool(self.settings("autoeval"))
+        add_listener = getattr(self.debugger.settings, "add_listener", None)
+        if add_listener is not None:
+            add_listener(self._refresh_autoeval)
+
+        # Filenames we have already warned about not matching their
+        # frame's code, least recently warned about first.
+        self.warned_file_mismatches: OrderedDict[str, None] = OrderedDict()
+
         self.cmd_instances = self._populate_commands()
 
         # command argument string. Is like current_command, but the part
-        # after cmd_name has been removed.
-        self.cmd_argstr = ""
+        # after cmd_name has been removed. It is computed from
+        # _cmd_line on first use; see the cmd_argstr property.
+        self._cmd_line = ""
+        self._cmd_argstr = ""
 
         # command name before alias or macro resolution
         self.cmd_name = ""
         self.cmd_queue = []  # Queued debugger commands
+
+        # True while process_commands() runs; see format_function_and_parameters().
+        self.frame_args_cacheable = False
+
+        # Command files given to queue_startfile() that were found to be
+        # readable, mapped to their user-expanded names. Only readable
+        # files are remembered, so that a file which appears later on is
+        # still found.
+        self.readable_startfiles: Dict[str, str] = {}
         self.completer = lambda text, state: completer(self, text, state)
         self.current_command = ""  # Current command getting run
         self.debug_nest = 1
         self.display_mgr = Mdisplay.DisplayMgr()
         self.intf = core_obj.debugger.intf
         self.last_command = None  # Initially a no-op
-        self.precmd_hooks = []
+        # Hooks are kept as insertion-ordered dicts mapping hook -> None
+        # so that membership tests and removal are constant time.
+        self.precmd_hooks = {}
 
         self.location = lambda: print_location(self)
 
-        self.preloop_hooks = []
-        self.postcmd_hooks = []
+        self.preloop_hooks = {}
+        self.postcmd_hooks = {}
         self.remap_file_re = None
 
         self._populate_cmd_lists()
@@ -484,6 +663,11 @@ class CommandProcessor(Processor):
         self.list_orig_lineno = 0  # line number of frame or exception on setup
         self.list_filename = None  # filename of frame or exception on setup
 
+        # The file print_location() last had pyficache update. Stopping
+        # again in the same file doesn't need another update; the
+        # "reload" setting covers files changing on disk.
+        self.last_updated_file = None
+
         self.macros = {}  # Debugger Macros
 
         # Create a custom safe Repr instance and increase its maxstring.
@@ -508,22 +692,90 @@ class CommandProcessor(Processor):
             self.queue_startfile(init_cmdfile)
         return
 
-    def _saferepr(self, str, maxwidth=None):
+    def _refresh_autoeval(self, key=None):
+        """Update our copy of the "autoeval" setting. `key` is the name
+        of the setting that changed, or None if that is not known."""
+        if key in (None, "autoeval"):
+            self._autoeval = bool(self.settings("autoeval"))
+
+    @property
+    def cmd_argstr(self) -> str:
+        # Most commands never look at their argument string, so it is
+        # sliced out of the command line only when asked for.
+        argstr = self._cmd_argstr
+        if argstr is None:
+            # partition() rather than slicing by len(cmd_name), since a
+            # line a macro returns can start with white space.
+            argstr = self._cmd_line.partition(self.cmd_name)[2].lstrip()
+            self._cmd_argstr = argstr
+        return argstr
+
+    @cmd_argstr.setter
+    def cmd_argstr(self, argstr: str):
+        self._cmd_argstr = argstr
+
+    def _saferepr(self, val, maxwidth=None):
         if maxwidth is None:
             maxwidth = self.debugger.settings["width"]
-        return self._repr.repr(str)[:maxwidth]
+        # Short ints and strings, and values that are never long, come
+        # out of Repr the same as from repr(); skip Repr's dispatch.
+        val_type = type(val)
+        if val_type in SHORT_REPR_TYPES:
+            return repr(val)[:maxwidth]
+        # Only repr() those ints and strings that could be short enough:
+        # Repr shortens a huge value without taking its full repr(), and
+        # handles ints too big for repr() to convert.
+        if val_type is str:
+            limit = self._repr.maxstring
+            if len(val) <= limit:
+                val_repr = repr(val)
+                if len(val_repr) <= limit:
+                    return val_repr[:maxwidth]
+        elif val_type is int:
+            limit = self._repr.maxlong
+            # An int of n bits has about n / 3.32 decimal digits.
+            if val.bit_length() <= limit * 3.32:
+                val_repr = repr(val)
+                if len(val_repr) <= limit:
+                    return val_repr[:maxwidth]
+        return self._repr.repr(val)[:maxwidth]
+
+    def warn_file_mismatch_once(self, filename: str) -> bool:
+        """Return True if we haven't recently warned about `filename` not
+        matching its frame, and record that we now have."""
+        warned_file_mismatches = self.warned_file_mismatches
+        if filename in warned_file_mismatches:
+            warned_file_mismatches.move_to_end(filename)
+            return False
+        warned_file_mismatches[filename] = None
+        if len(warned_file_mismatches) > WARNED_FILE_MISMATCHES_SIZE:
+            warned_file_mismatches.popitem(last=False)
+        return True
 
     def add_preloop_hook(self, hook, position=-1, nodups=True):
-        if hook in self.preloop_hooks:
+        """Add `hook' to the preloop hooks at `position', as
+        list.insert() would."""
+        preloop_hooks = self.preloop_hooks
+        if hook in preloop_hooks:
             return False
-        self.preloop_hooks.insert(position, hook)
+        if position >= len(preloop_hooks):
+            preloop_hooks[hook] = None
+        else:
+            # Rebuild the dict in place with the hook at its position.
+            hooks = list(preloop_hooks)
+            hooks.insert(position, hook)
+            preloop_hooks.clear()
+            preloop_hooks.update(dict.fromkeys(hooks))
         return True
 
     def add_remap_pat(self, pat, replace, clear_remap=True):
         pyficache.main.add_remap_pat(pat, replace, clear_remap)
+        _remap_pat_cache.clear()
         if clear_remap:
             self.file2file_remap = {}
+            self.last_updated_file = None
             pyficache.file2file_remap = {}
+            self.core.clear_filename_cache()
 
     # To be overridden in derived debuggers
     def defaultFile(self):
@@ -596,7 +848,7 @@ class CommandProcessor(Processor):
                 "reload_on_change": self.settings("reload"),
                 "strip_nl": False,
             }
-            m = re.search("^<frozen (.*)>", filename)
+            m = _re_frozen.match(filename)
             if m and m.group(1):
                 filename = pyficache.unmap_file(m.group(1))
             line = pyficache.getline(filename, lineno, opts)
@@ -627,7 +879,11 @@ class CommandProcessor(Processor):
     def eval(self, arg, show_error=True):
         """Eval string arg in the current frame context."""
         try:
-            return eval(arg, self.curframe.f_globals, self.curframe.f_locals)
+            return eval(
+                compile_cached(arg.lstrip(" \t")),
+                self.curframe.f_globals,
+                self.curframe.f_locals,
+            )
         except Exception:
             t, _ = sys.exc_info()[:2]
             if isinstance(t, str):
@@ -671,7 +927,7 @@ class CommandProcessor(Processor):
             # in interaction.
             global_vars = None
         try:
-            code = compile(line + "\n", f'"{line}"', "single")
+            code = compile_cached(line + "\n", f'"{line}"', "single")
             exec(code, global_vars, local_vars)
         except Exception:
             t, v = sys.exc_info()[:2]
@@ -719,7 +975,7 @@ class CommandProcessor(Processor):
             locals_dict = locals()
             pass
         try:
-            val = int(eval(arg, g, locals_dict))
+            val = int(eval(compile_cached(arg.lstrip(" \t")), g, locals_dict))
         except (SyntaxError, NameError, ValueError, TypeError):
             return None
         return val
@@ -774,7 +1030,9 @@ class CommandProcessor(Processor):
         if not locals:
             locals = self.curframe.f_locals
         try:
-            return eval(arg, self.curframe.f_globals, locals)
+            return eval(
+                compile_cached(arg.lstrip(" \t")), self.curframe.f_globals, locals
+            )
         except Exception:
             t, v = sys.exc_info()[:2]
             if isinstance(t, str):
@@ -790,8 +1048,9 @@ class CommandProcessor(Processor):
         whether it makes sense to run the command in this execution state,
         if the command has the right number of arguments and so on.
         """
-        if hasattr(cmd_obj, "execution_set"):
-            if not (self.core.execution_status in cmd_obj.execution_set):
+        execution_set = getattr(cmd_obj, "execution_set", None)
+        if execution_set is not None:
+            if not (self.core.execution_status in execution_set):
                 part1 = f"Command '{name}' is not available for execution status:"
                 mess = Mmisc.wrapped_lines(
                     part1, self.core.execution_status, self.debugger.settings["width"]
@@ -851,48 +1110,61 @@ class CommandProcessor(Processor):
         leave_loop = run_hooks(self, self.preloop_hooks)
         self.continue_running = False
 
-        while not leave_loop:
-            try:
-                run_hooks(self, self.precmd_hooks)
-                # bdb had a True return to leave loop.
-                # A more straight-forward way is to set
-                # instance variable self.continue_running.
-                leave_loop = self.process_command()
-                if leave_loop or self.continue_running:
-                    break
-            except EOFError:
-                # If we have stacked interfaces, pop to the next
-                # one.  If this is the last one however, we'll
-                # just stick with that.  FIXME: Possibly we should
-                # check to see if we are interactive.  and not
-                # leave if that's the case. Is this the right
-                # thing?  investigate and fix.
-                if len(self.debugger.intf) > 1:
-                    del self.debugger.intf[-1]
-                    self.last_command = ""
-                else:
-                    if self.debugger.intf[-1].output:
-                        self.debugger.intf[-1].output.writeline("Leaving")
-                        raise SystemExit
-                    break
+        # Formatted frame parameters are reused only while the program
+        # is stopped here, and only within a single command.
+        self.frame_args_cacheable = True
+        try:
+            while not leave_loop:
+                try:
+                    run_hooks(self, self.precmd_hooks)
+                    # bdb had a True return to leave loop.
+                    # A more straight-forward way is to set
+                    # instance variable self.continue_running.
+                    try:
+                        leave_loop = self.process_command()
+                    finally:
+                        # A command can run code that changes locals.
+                        clear_arg_cache()
+                    if leave_loop or self.continue_running:
+                        break
+                except EOFError:
+                    # If we have stacked interfaces, pop to the next
+                    # one.  If this is the last one however, we'll
+                    # just stick with that.  FIXME: Possibly we should
+                    # check to see if we are interactive.  and not
+                    # leave if that's the case. Is this the right
+                    # thing?  investigate and fix.
+                    intfs = self.debugger.intf
+                    if len(intfs) > 1:
+                        del intfs[-1]
+                        self.last_command = ""
+                    else:
+                        output = intfs[-1].output
+                        if output:
+                            output.writeline("Leaving")
+                            raise SystemExit
+                        break
+                    pass
                 pass
-            pass
+        finally:
+            self.frame_args_cacheable = False
         return run_hooks(self, self.postcmd_hooks)
 
     def process_command(self):
         # process command
+        intf = self.intf[-1]
         if len(self.cmd_queue) > 0:
             current_command = self.cmd_queue[0].strip()
             del self.cmd_queue[0]
         else:
-            current_command = self.intf[-1].read_command(self.prompt_str).strip()
-            if "" == current_command and self.intf[-1].interactive:
+            current_command = intf.read_command(self.prompt_str).strip()
+            if "" == current_command and intf.interactive:
                 current_command = self.last_command
                 pass
             pass
         # Look for comments
         if "" == current_command:
-            if self.intf[-1].interactive:
+            if intf.interactive:
                 self.errmsg("No previous command registered, " + "so this is a no-op.")
                 pass
             return False
@@ -904,47 +1176,57 @@ class CommandProcessor(Processor):
             self.errmsg("bad parse %s: %s" % sys.exc_info()[0:2])
             return False
 
+        # "debugmacro" is looked up at most once, and only when a macro
+        # actually gets expanded.
+        macros = self.macros
+        debugmacro = None
+
+        # With a single command, the argument string is sliced out of
+        # the line as typed. When ";;" separates several commands, the
+        # line holds all of them, so each command's line is rebuilt from
+        # its own arguments.
+        single_command = len(args_list) == 1
+
         for args in args_list:
             if len(args):
+                cmd_line = current_command if single_command else " ".join(args)
                 while True:
                     if len(args) == 0:
                         return False
                     macro_cmd_name = args[0]
-                    if macro_cmd_name not in self.macros:
+                    if macro_cmd_name not in macros:
                         break
                     try:
-                        current_command = self.macros[macro_cmd_name][0](*args[1:])
+                        current_command = macros[macro_cmd_name][0](*args[1:])
                     except TypeError:
                         t, v = sys.exc_info()[:2]
                         self.errmsg(f"Error expanding macro {macro_cmd_name}")
                         return False
-                    if self.settings("debugmacro"):
+                    if debugmacro is None:
+                        debugmacro = self.settings("debugmacro")
+                        pass
+                    if debugmacro:
                         print(current_command)
                         pass
                     if isinstance(current_command, list):
-                        for x in current_command:
-                            if str != type(x):
-                                self.errmsg(
-                                    (
-                                        "macro %s should return a List "
-                                        + "of Strings. Has %s of type %s"
-                                    )
-                                    % (
-                                        macro_cmd_name,
-                                        x,
-                                        repr(current_command),
-                                        type(x),
-                                    )
-                                )
-                                return False
-                            pass
+                        if not current_command or not all(
+                            type(x) is str for x in current_command
+                        ):
+                            self.errmsg(
+                                f"macro {macro_cmd_name} should return a "
+                                f"non-empty List of Strings, got {current_command!r}"
+                            )
+                            return False
 
-                        first = current_command[0]
+                        # Run the first command now, and the rest right
+                        # after it, ahead of anything already queued.
+                        first, *rest = current_command
+                        self.cmd_queue[:0] = rest
                         args = first.split()
-                        self.cmd_queue + [current_command[1:]]
-                        current_command = first
+                        current_command = cmd_line = first
                     elif type(current_command) == str:
                         args = current_command.split()
+                        cmd_line = current_command
                     else:
                         self.errmsg(
                             (
@@ -957,11 +1239,22 @@ class CommandProcessor(Processor):
                     pass
 
                 self.cmd_name = args[0]
-                cmd_name = resolve_name(self, self.cmd_name)
-                self.cmd_argstr = current_command[len(self.cmd_name) :].lstrip()
+                resolved = self.resolved_cmd_cache.get(self.cmd_name)
+                if resolved is None:
+                    cmd_name = resolve_name(self, self.cmd_name)
+                    if cmd_name:
+                        resolved = (cmd_name, self.commands[cmd_name])
+                        self.resolved_cmd_cache[self.cmd_name] = resolved
+                    else:
+                        # Don't remember misses: with autoeval, each
+                        # expression's first word would be one.
+                        resolved = (None, None)
+                    pass
+                cmd_name, cmd_obj = resolved
+                self._cmd_line = cmd_line
+                self._cmd_argstr = None
                 if cmd_name:
                     self.last_command = current_command
-                    cmd_obj = self.commands[cmd_name]
                     if self.ok_for_running(cmd_obj, cmd_name, len(args) - 1):
                         try:
                             self.current_command = current_command
@@ -972,11 +1265,13 @@ class CommandProcessor(Processor):
                             # Let these exceptions propagate through
                             raise
                         except Exception:
+                            import traceback
+
                             self.errmsg("INTERNAL ERROR: " + traceback.format_exc())
                             pass
                         pass
                     pass
-                elif not self.settings("autoeval"):
+                elif not self._autoeval:
                     self.undefined_cmd(current_command)
                 else:
                     # Autoeval
@@ -986,12 +1281,10 @@ class CommandProcessor(Processor):
             pass
         return False
 
-    def remove_preloop_hook(self, hook):
-        try:
-            position = self.preloop_hooks.index(hook)
-        except ValueError:
+    def remove_preloop_hook(self, hook) -> bool:
+        if hook not in self.preloop_hooks:
             return False
-        del self.preloop_hooks[position]
+        del self.preloop_hooks[hook]
         return True
 
     def setup(self):
@@ -1043,9 +1336,14 @@ class CommandProcessor(Processor):
     def queue_startfile(self, cmdfile):
         """Arrange for file of debugger commands to get read in the
         process-command loop."""
+        expanded_cmdfile = self.readable_startfiles.get(cmdfile)
+        if expanded_cmdfile is not None:
+            self.cmd_queue.append("source " + expanded_cmdfile)
+            return
         expanded_cmdfile = osp.expanduser(cmdfile)
         is_readable = Mfile.readable(expanded_cmdfile)
         if is_readable:
+            self.readable_startfiles[cmdfile] = expanded_cmdfile
             self.cmd_queue.append("source " + expanded_cmdfile)
         elif is_readable is None:
             self.errmsg(f"source file '{expanded_cmdfile}' doesn't exist")
@@ -1061,30 +1359,25 @@ class CommandProcessor(Processor):
 
     def read_history_file(self):
         """Read the command history file -- possibly."""
+        if _readline is None:
+            return
         histfile = self.debugger.intf[-1].histfile
         try:
-            import readline
-
-            readline.read_history_file(histfile)
+            _readline.read_history_file(histfile)
         except IOError:
             pass
-        except ImportError:
-            pass
         return
 
     def write_history_file(self):
         """Write the command history file -- possibly."""
+        if _readline is None:
+            return
         settings = self.debugger.settings
         histfile = self.debugger.intf[-1].histfile
         if settings["hist_save"]:
             try:
-                import readline
-
-                try:
-                    readline.write_history_file(histfile)
-                except IOError:
-                    pass
-            except ImportError:
+                _readline.write_history_file(histfile)
+            except IOError:
                 pass
             pass
         return
@@ -1097,68 +1390,64 @@ class CommandProcessor(Processor):
         and scan for class names inside those files and for each class
         name, we will create an instance of that class. The set of
         DebuggerCommand class instances form set of possible debugger
-        commands."""
-        from pymathics.trepan.processor import command as Mcommand
+        commands.
 
-        if hasattr(Mcommand, "__modules__"):
-            return self.populate_commands_easy_install(Mcommand)
-        else:
-            return self.populate_commands_pip(Mcommand)
+        The scan is done only once; later processors reuse the classes
+        found the first time."""
+        global _command_classes
+        if _command_classes is None:
+            from pymathics.trepan.processor import command as Mcommand
+
+            if hasattr(Mcommand, "__modules__"):
+                _command_classes = self.populate_commands_easy_install(Mcommand)
+            else:
+                _command_classes = self.populate_commands_pip(Mcommand)
+            pass
 
-    def populate_commands_pip(self, Mcommand):
         cmd_instances = []
-        eval_cmd_template = "command_mod.%s(self)"
+        for mod_name, command_class in _command_classes:
+            try:
+                cmd_instances.append(command_class(self))
+            except Exception:
+                print(
+                    f"Error loading {command_class.__name__} from {mod_name}: "
+                    f"{sys.exc_info()[0]}"
+                )
+                pass
+            pass
+        return cmd_instances
+
+    def populate_commands_pip(self, Mcommand) -> List[Tuple[str, type]]:
+        """Return a list of (module name, command class) for the
+        command classes found in the modules of package Mcommand."""
+        command_classes = []
         for mod_name in Mcommand.__dict__.keys():
             if mod_name.startswith("__"):
                 continue
             import_name = "trepan.processor.command." + mod_name
-            imp = __import__(import_name)
-            if imp.__name__ == mod_name:
-                command_mod = imp.processor.command
-            else:
-                if mod_name in (
-                    "info_sub",
-                    "set_sub",
-                    "show_sub",
-                ):
+            try:
+                command_mod = importlib.import_module(import_name)
+            except Exception:
+                # Don't need to warn about optional modules
+                if mod_name not in self.optional_modules:
+                    print(f"Error importing {mod_name}: {sys.exc_info()[0]}")
                     pass
-                try:
-                    command_mod = getattr(__import__(import_name), mod_name)
-                except Exception:
-                    # Don't need to warn about optional modules
-                    if mod_name not in self.optional_modules:
-                        print(f"Error importing {mod_name}: {sys.exc_info()[0]}")
-                        pass
-                    continue
-                pass
+                continue
 
-            classnames = [
-                tup[0]
-                for tup in inspect.getmembers(command_mod, inspect.isclass)
-                if ("DebuggerCommand" != tup[0] and tup[0].endswith("Command"))
-            ]
-            for classname in classnames:
-                eval_cmd = eval_cmd_template % classname
-                try:
-                    instance = eval(eval_cmd)
-                    cmd_instances.append(instance)
-                except Exception:
-                    print(
-                        "Error loading %s from %s: %s"
-                        % (classname, mod_name, sys.exc_info()[0])
-                    )
-                    pass
+            for command_class in find_command_classes(command_mod):
+                command_classes.append((mod_name, command_class))
                 pass
             pass
-        return cmd_instances
+        return command_classes
 
     # This is the most-used way of adding commands
-    def populate_commands_easy_install(self, Mcommand):
+    def populate_commands_easy_install(self, Mcommand) -> List[Tuple[str, type]]:
         """
-        Add files in filesystem to self.commands.
+        Return a list of (module name, command class) for the command
+        classes in the files listed in Mcommand.__modules__.
         If running from source or from an easy_install'd package, this is used.
         """
-        cmd_instances = []
+        command_classes = []
 
         for mod_name in Mcommand.__modules__:
             if mod_name in (
@@ -1177,21 +1466,11 @@ class CommandProcessor(Processor):
                     pass
                 continue
 
-            classnames = [
-                tup[0]
-                for tup in inspect.getmembers(command_mod, inspect.isclass)
-                if ("DebuggerCommand" != tup[0] and tup[0].endswith("Command"))
-            ]
-            for classname in classnames:
-                try:
-                    instance = getattr(command_mod, classname)(self)
-                    cmd_instances.append(instance)
-                except Exception:
-                    print(f"Error loading {classname} from mod_name, sys.exc_info()[0]")
-                    pass
+            for command_class in find_command_classes(command_mod):
+                command_classes.append((mod_name, command_class))
                 pass
             pass
-        return cmd_instances
+        return command_classes
 
     def _populate_cmd_lists(self):
         """Populate self.lists and hashes:
@@ -1199,6 +1478,12 @@ class CommandProcessor(Processor):
         self.commands = {}
         self.aliases = {}
         self.category = {}
+        # (resolved name, command object) for each command name typed
+        # that names a command, so that process_command() needn't
+        # resolve aliases every time.
+        # Anything that changes self.commands or self.aliases should
+        # clear this.
+        self.resolved_cmd_cache = {}
         #         self.short_help = {}
         for cmd_instance in self.cmd_instances:
             if not hasattr(cmd_instance, "aliases"):
@@ -1257,6 +1542,8 @@ if __name__ == "__main__":
     cmdproc.location()
     print("-" * 10)
     print(cmdproc.eval("1+2"))
+    # Leading white space is fine, as it is for eval().
+    assert cmdproc.eval(" \t1+2") == 3
     print(cmdproc.eval("len(aliases)"))
     import pprint
 
@@ -1272,6 +1559,6 @@ if __name__ == "__main__":
 
     print(f"Removing non-existing quit hook: {cmdproc.remove_preloop_hook(fn)}")
     cmdproc.add_preloop_hook(fn)
-    print(cmdproc.preloop_hooks)
+    print(list(cmdproc.preloop_hooks))
     print(f"Removed existing quit hook: {cmdproc.remove_preloop_hook(fn)}")
     pass
@@ -18,6 +18,12 @@ from trepan.processor.command.alias import AliasCommand as TrepanAliasCommand
 
 
 class AliasCommand(TrepanAliasCommand):
+    def run(self, args):
+        result = super().run(args)
+        # Aliases may have changed.
+        self.proc.resolved_cmd_cache.clear()
+        return result
+
     pass
 
 if __name__ == "__main__":
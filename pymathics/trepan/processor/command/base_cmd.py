@@ -22,6 +22,8 @@ and commands.py needs to take care to avoid instantiating this class
 and storing it as a list of known debugger commands.
 """
 
+import sys
+
 import columnize
 from pygments.console import colorize
 
@@ -29,7 +31,29 @@ from trepan.lib.format import rst_text
 
 NotImplementedMessage = "This method must be overridden in a subclass"
 
-__all__ = ["DebuggerCommand"]
+__all__ = ["DebuggerCommand", "find_command_classes"]
+
+
+def find_command_classes(command_mod) -> tuple:
+    """Return the debugger command classes that module `command_mod`
+    defines: the classes named *Command in its ``_debugger_commands``
+    list, or, for modules whose commands are based on trepan3k's
+    DebuggerCommand and so do not register themselves, the classes named
+    *Command that the module itself defines. Classes a module merely
+    imports, say to subclass them, are not included."""
+    mod_name = command_mod.__name__
+    command_classes = getattr(command_mod, "_debugger_commands", None)
+    if command_classes is None:
+        command_classes = [
+            obj for obj in vars(command_mod).values() if isinstance(obj, type)
+        ]
+    return tuple(
+        cls
+        for cls in command_classes
+        if cls.__name__.endswith("Command")
+        and cls.__name__ != "DebuggerCommand"
+        and cls.__module__ == mod_name
+    )
 
 
 class DebuggerCommand:
@@ -38,6 +62,15 @@ class DebuggerCommand:
 
     category = "misc"
 
+    def __init_subclass__(cls, **kwargs):
+        """Record each command class in the ``_debugger_commands`` list of
+        the module that defines it, so that the class can be found
+        without scanning the module."""
+        super().__init_subclass__(**kwargs)
+        module = sys.modules.get(cls.__module__)
+        if module is not None:
+            module.__dict__.setdefault("_debugger_commands", []).append(cls)
+
     @staticmethod
     def setup(local_dict, category="misc", min_args=0, max_args=None, need_stack=False):
         local_dict["name"] = local_dict["__module__"].split(".")[-1]
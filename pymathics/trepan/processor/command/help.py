@@ -134,11 +134,8 @@ class HelpCommand(DebuggerCommand):
                         pass
                     pass
             else:
-                cmds = [
-                    cmd
-                    for cmd in list(self.proc.commands.keys())
-                    if re.match("^" + cmd_name, cmd)
-                ]
+                cmd_re = re.compile("^" + cmd_name)
+                cmds = [cmd for cmd in self.proc.commands.keys() if cmd_re.match(cmd)]
                 if cmds is None:
                     self.errmsg(
                         "No commands found matching /^%s/. " 'Try "help".' % cmd_name
@@ -182,7 +179,7 @@ Type `help` *regexp* for the list of commands matching /^#{*regexp*}/
 Type `help` *category* `*` for the list of all commands in category *category*
 Type `help` followed by command name for full documentation.
 """
-        for line in re.compile("\n").split(final_msg.rstrip("\n")):
+        for line in final_msg.rstrip("\n").split("\n"):
             self.rst_msg(line)
             pass
         return
@@ -59,7 +59,7 @@ class PrintElementCommand(DebuggerCommand):
                 self.errmsg(f"unhandled option '{o}'")
             pass
 
-        text = self.proc.current_command[len(self.proc.cmd_name) :].lstrip()
+        text = self.proc.cmd_argstr
         if text.startswith("-p"):
             text = text[2:]
         text = text.strip()
@@ -23,29 +23,28 @@ from trepan.processor.command.base_cmd import DebuggerCommand
 
 
 def ctype_async_raise(thread_obj, exception):
-    found = False
-    target_tid = 0
-    for tid, tobj in threading._active.items():
-        if tobj is thread_obj:
-            found = True
-            target_tid = tid
-            break
-
-    if not found:
+    # A thread's ident is its key in threading._active, so there is no
+    # need to scan that dictionary looking for thread_obj.
+    tid = thread_obj.ident
+    if tid is None or tid not in threading._active:
         raise ValueError("Invalid thread object")
 
+    # Thread idents are C unsigned longs and can be larger than what
+    # fits in the C int that ctypes would otherwise pass.
+    target_tid = ctypes.c_ulong(tid)
     ret = ctypes.pythonapi.PyThreadState_SetAsyncExc(
         target_tid, ctypes.py_object(exception)
     )
     # ref: http://docs.python.org/c-api/init.html#PyThreadState_SetAsyncExc
-    if ret == 0:
-        raise DebuggerQuitException
-    elif ret > 1:
-        # Huh? Why would we notify more than one threads?
-        # Because we punch a hole into C level interpreter.
-        # So it is better to clean up the mess.
-        ctypes.pythonapi.PyThreadState_SetAsyncExc(target_tid, 0)
-        raise SystemError("PyThreadState_SetAsyncExc failed")
+    # The return value is the number of thread states modified.
+    if ret != 1:
+        # Either the thread is gone, or, since we punch a hole into the
+        # C-level interpreter, more than one thread got the exception.
+        # Clean up the mess by clearing any pending exception.
+        ctypes.pythonapi.PyThreadState_SetAsyncExc(target_tid, None)
+        raise SystemError(
+            f"PyThreadState_SetAsyncExc for thread {tid} modified {ret} thread states"
+        )
 
 
 class QuitCommand(DebuggerCommand):
@@ -87,7 +86,10 @@ class QuitCommand(DebuggerCommand):
         mythread = threading.current_thread()
         for t in threading_list:
             if t != mythread:
-                ctype_async_raise(t, DebuggerQuitException)
+                try:
+                    ctype_async_raise(t, DebuggerQuitException)
+                except (SystemError, ValueError) as e:
+                    self.errmsg(f"Could not stop thread {t.name}: {e}")
                 pass
             pass
         raise DebuggerQuitException
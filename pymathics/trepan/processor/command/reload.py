@@ -16,9 +16,13 @@
 
 import importlib
 import inspect
+import sys
 
 # Our local modules
-from pymathics.trepan.processor.command.base_cmd import DebuggerCommand
+from pymathics.trepan.processor.command.base_cmd import (
+    DebuggerCommand,
+    find_command_classes,
+)
 from pymathics.trepan.processor.command.base_submgr import SubcommandMgr
 
 
@@ -50,24 +54,35 @@ class ReloadCommand(DebuggerCommand):
             if cmd_name not in proc.commands:
                 self.errmsg(f'command "{cmd_name}" not found as a debugger command')
                 return
-            command_module = importlib.import_module(proc.commands[cmd_name].__module__)
+            module_name = proc.commands[cmd_name].__module__
+            command_module = importlib.import_module(module_name)
+            # reload() reuses the module object, so drop the classes
+            # registered by the previous load.
+            command_module.__dict__.pop("_debugger_commands", None)
             importlib.reload(command_module)
-            classnames = [
-                tup[0]
-                for tup in inspect.getmembers(command_module, inspect.isclass)
-                if ("DebuggerCommand" != tup[0] and tup[0].endswith("Command"))
-            ]
-            if len(classnames) == 1:
+
+            command_classes = find_command_classes(command_module)
+            if len(command_classes) == 1:
+                command_class = command_classes[0]
+                classname = command_class.__name__
                 try:
-                    instance = getattr(command_module, classnames[0])(proc)
+                    instance = command_class(proc)
                 except Exception:
                     self.errmsg(
-                        f"Error loading {classnames[0]} from mod_name, sys.exc_info()[0]"
+                        f"Error loading {classname} from {command_module.__name__}: "
+                        f"{sys.exc_info()[0]}"
                     )
                     return
 
                 # FIXME: should we also replace object in proc.cmd_instances?
                 proc.commands[cmd_name] = instance
+                proc.resolved_cmd_cache.clear()
+
+                # Command processors created from now on should get the
+                # reloaded class too.
+                from pymathics.trepan.processor.cmdproc import clear_command_classes
+
+                clear_command_classes()
                 self.msg(f'reloaded command: "{cmd_name}"')
             pass
         else:
@@ -99,7 +114,8 @@ class ReloadCommand(DebuggerCommand):
                     instance = getattr(subcommand_module, classnames[0])(subcmd)
                 except Exception:
                     self.errmsg(
-                        f"Error loading {classnames[0]} from mod_name, sys.exc_info()[0]"
+                        f"Error loading {classnames[0]} from "
+                        f"{subcommand_module.__name__}: {sys.exc_info()[0]}"
                     )
                     return
 
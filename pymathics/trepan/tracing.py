@@ -3,7 +3,8 @@ import re
 import time
 import types
 from enum import Enum
-from typing import Callable, Dict, List, Union
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Union
 
 import mathics.eval.tracing as eval_tracing
 from mathics.core.evaluation import Evaluation
@@ -32,23 +33,23 @@ TraceEventNames = (
 )
 TraceEvent = Enum("TraceEvent", TraceEventNames)
 
-# Event filtering masks. An empty list
+# Event filtering masks. An empty set
 # means not filtering. To remove filtering
 # though set the event to False.
 # Setting an event to True force the last
 # set of filters to go into effect.
 #
-event_filters: Dict[str, List[str]] = {
-    "Get": [],
-    "Numpy": [],
-    "SymPy": [],
-    "apply": [],
-    "applyBox": [],
-    "evaluate-entry": [],  # Before evaluate()
-    "evaluate-result": [],  # After evaluate() when we have a value
-    "evalMethod": [],
-    "evalFunction": [],
-    "mpmath": [],
+event_filters: Dict[str, FrozenSet[str]] = {
+    "Get": frozenset(),
+    "Numpy": frozenset(),
+    "SymPy": frozenset(),
+    "apply": frozenset(),
+    "applyBox": frozenset(),
+    "evaluate-entry": frozenset(),  # Before evaluate()
+    "evaluate-result": frozenset(),  # After evaluate() when we have a value
+    "evalMethod": frozenset(),
+    "evalFunction": frozenset(),
+    "mpmath": frozenset(),
 }
 
 
@@ -57,6 +58,15 @@ dbg = None
 saved_methods: Dict[str, Callable] = {}
 
 
+_re_box_name = re.compile(r"^System`[A-Z][A-Za-z0-9]+Box")
+
+
+@lru_cache(maxsize=512)
+def _is_box_name(name: str) -> bool:
+    """Return True if the head name `name` is that of a Boxing function."""
+    return _re_box_name.match(name) is not None
+
+
 def apply_builtin_fn_traced_common(
     self, expression, vars, options: dict, evaluation, trace_boxing: bool
 ):
@@ -73,8 +83,7 @@ def apply_builtin_fn_traced_common(
 
     if (
         eval_tracing.hook_entry_fn is not None
-        and bool(re.match("^System`[A-Z][A-Za-z0-9]+Box", expression.head.name))
-        == trace_boxing
+        and _is_box_name(expression.head.name) == trace_boxing
     ):
         args = (self, expression, vars, options, evaluation)
         skip_call = eval_tracing.hook_entry_fn(TraceEvent.apply, *args)